@@ -1,9 +1,11 @@
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import select, text, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import OperationalError
 from asyncpg.exceptions import ConnectionDoesNotExistError, TooManyConnectionsError
 from decimal import Decimal
+from datetime import date, datetime, UTC
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -15,7 +17,9 @@ from sqlalchemy.exc import SQLAlchemyError
 from typing import Tuple
 import logging
 
-from .models import Wallet, OperationType
+from .models import (
+    Wallet, Transaction, WalletDailyStats, OperationType, TransactionStatus, DurabilityTier
+)
 
 async def create_wallet(session: AsyncSession) -> Wallet:
     """Creates a new wallet with zero balance"""
@@ -34,6 +38,63 @@ async def get_wallet(session: AsyncSession, wallet_id: UUID) -> Wallet | None:
     result = await session.execute(query)
     return result.scalar_one_or_none()
 
+async def get_wallets(session: AsyncSession, wallet_ids: list[UUID]) -> list[Wallet]:
+    """
+    Gets wallets by their IDs; missing IDs are skipped.
+    The IDs are sent as a single array parameter (id = ANY($1)), so the
+    statement text is the same for any number of IDs.
+    """
+    ids_param = bindparam("wallet_ids", wallet_ids, type_=ARRAY(PG_UUID(as_uuid=True)))
+    query = select(Wallet).where(Wallet.id == any_(ids_param))
+    result = await session.execute(query)
+    return list(result.scalars())
+
+async def add_to_daily_stats(
+    session: AsyncSession,
+    wallet_id: UUID,
+    day: date,
+    operation_type: OperationType,
+    amount: Decimal
+) -> None:
+    """Adds one operation to the wallet's daily rollup row, creating it if needed"""
+    statement = insert(WalletDailyStats).values(
+        wallet_id=wallet_id,
+        day=day,
+        operation_type=operation_type,
+        total_amount=amount,
+        operation_count=1
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[
+            WalletDailyStats.wallet_id,
+            WalletDailyStats.day,
+            WalletDailyStats.operation_type
+        ],
+        set_={
+            "total_amount": WalletDailyStats.total_amount + statement.excluded.total_amount,
+            "operation_count": WalletDailyStats.operation_count + 1
+        }
+    )
+    await session.execute(statement)
+
+async def get_daily_stats(
+    session: AsyncSession,
+    wallet_id: UUID,
+    date_from: date,
+    date_to: date
+) -> list[WalletDailyStats]:
+    """Gets the wallet's daily rollup rows for an inclusive date range"""
+    query = (
+        select(WalletDailyStats)
+        .where(
+            WalletDailyStats.wallet_id == wallet_id,
+            WalletDailyStats.day.between(date_from, date_to)
+        )
+        .order_by(WalletDailyStats.day)
+    )
+    result = await session.execute(query)
+    return list(result.scalars())
+
 async def get_wallet_for_update(session: AsyncSession, wallet_id: UUID) -> Wallet | None:
     """Gets wallet with row-level lock for update"""
     query = (
@@ -53,9 +114,18 @@ async def update_wallet_balance(
     session: AsyncSession, 
     wallet_id: UUID,
     operation_type: OperationType,
-    amount: Decimal
-) -> Tuple[Wallet, Decimal]:
+    amount: Decimal,
+    durability: DurabilityTier = DurabilityTier.STRICT
+) -> Tuple[Wallet, Transaction]:
+    """
+    Applies a deposit or withdrawal and records it in the ledger in one commit.
+    ASYNC_COMMIT skips waiting for the WAL flush; SET LOCAL keeps the setting
+    scoped to this transaction, so it cannot leak to other clients through
+    PgBouncer transaction pooling.
+    """
     try:
+        if durability == DurabilityTier.ASYNC_COMMIT:
+            await session.execute(text("SET LOCAL synchronous_commit TO OFF"))
         wallet = await session.get(Wallet, wallet_id)
         if not wallet:
             raise HTTPException(status_code=404, detail="Wallet not found")
@@ -67,8 +137,20 @@ async def update_wallet_balance(
                               detail="Insufficient funds or operation cannot be processed")
             
         wallet.balance = new_balance
+        transaction = Transaction(
+            wallet_id=wallet_id,
+            operation_type=operation_type,
+            amount=amount,
+            status=TransactionStatus.SUCCESS,
+            durability=durability,
+            created_at=datetime.now(UTC)
+        )
+        session.add(transaction)
+        await add_to_daily_stats(
+            session, wallet_id, transaction.created_at.date(), operation_type, amount
+        )
         await session.commit()
-        return wallet, amount
+        return wallet, transaction
         
     except TooManyConnectionsError:
         await session.rollback()
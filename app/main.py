@@ -1,12 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from .database import settings, init_engines, dispose_engines, warm_up_connections
+from .notifications import broadcaster
 from .routers import wallets
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Creates this worker's database engines on startup and disposes them on shutdown"""
+    init_engines()
+    await warm_up_connections(settings.DB_WARMUP_CONNECTIONS)
+    yield
+    await broadcaster.stop()
+    await dispose_engines()
+
 app = FastAPI(
     title="Wallet API",
     description="API for managing wallets and transactions",
     version="1.0.0",
-    redirect_slashes=False
+    redirect_slashes=False,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -0,0 +1,72 @@
+"""
+Schema version check used by entrypoint.sh to skip Liquibase on boot.
+
+After a successful `liquibase update` the entrypoint tags the last applied
+changeset with a checksum of the changelog file. On the next start the tag is
+read back from `databasechangelog` and compared with the checksum of the
+changelog on disk; when they match the JVM run is skipped.
+
+Usage:
+    python -m app.migrations checksum   # print the changelog checksum
+    python -m app.migrations check      # exit 0 if the schema is current, 1 otherwise
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .database import get_engine
+
+CHANGELOG_PATH = os.environ.get(
+    "LIQUIBASE_CHANGELOG",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "liquibase", "changelog", "changelog.xml")
+)
+TAG_PREFIX = "changelog-"
+
+def changelog_checksum(path: str = CHANGELOG_PATH) -> str:
+    """Returns the Liquibase tag identifying the given changelog contents"""
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return f"{TAG_PREFIX}{digest[:32]}"
+
+async def read_applied_checksum() -> str | None:
+    """
+    Reads the tag of the most recently applied changeset.
+    Returns None if the changelog table does not exist or is empty.
+    """
+    engine = get_engine()
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("""
+                SELECT tag
+                FROM databasechangelog
+                ORDER BY orderexecuted DESC
+                LIMIT 1
+            """))
+            return result.scalar_one_or_none()
+    except SQLAlchemyError as e:
+        logging.warning(f"Could not read databasechangelog: {str(e)}")
+        return None
+    finally:
+        await engine.dispose()
+
+async def schema_is_current(path: str = CHANGELOG_PATH) -> bool:
+    """Checks whether the database was migrated with the changelog at `path`"""
+    return await read_applied_checksum() == changelog_checksum(path)
+
+def main(argv: list[str]) -> int:
+    command = argv[1] if len(argv) > 1 else "check"
+    if command == "checksum":
+        print(changelog_checksum())
+        return 0
+    if command == "check":
+        return 0 if asyncio.run(schema_is_current()) else 1
+    print(__doc__, file=sys.stderr)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, UTC
 from enum import Enum
-from sqlalchemy import Column, DateTime, Enum as SQLEnum, ForeignKey, Numeric
+from sqlalchemy import BigInteger, Column, Date, DateTime, Enum as SQLEnum, ForeignKey, Numeric
 from sqlalchemy.dialects.postgresql import UUID
 from .database import Base
 from sqlalchemy.orm import mapped_column
@@ -15,6 +15,10 @@ class OperationType(str, Enum):
     DEPOSIT = "DEPOSIT"
     WITHDRAW = "WITHDRAW"
 
+class DurabilityTier(str, Enum):
+    STRICT = "STRICT"
+    ASYNC_COMMIT = "ASYNC_COMMIT"
+
 class Wallet(Base):
     __tablename__ = "wallets"
 
@@ -27,6 +31,8 @@ class Wallet(Base):
         default=lambda: datetime.now(UTC),
         onupdate=lambda: datetime.now(UTC)
     )
+    # Balance changes are published with NOTIFY only while this lease is in the future
+    notify_until = Column(DateTime(timezone=True), nullable=True)
 
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -36,4 +42,15 @@ class Transaction(Base):
     operation_type = Column(SQLEnum(OperationType), nullable=False)
     amount = Column(Numeric(18, 2), nullable=False)
     status = Column(SQLEnum(TransactionStatus), nullable=False, default=TransactionStatus.PENDING)
+    durability = Column(SQLEnum(DurabilityTier), nullable=False, default=DurabilityTier.STRICT)
     created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
+
+class WalletDailyStats(Base):
+    """Per-wallet daily totals, maintained in the same commit as each ledger entry (UTC days)"""
+    __tablename__ = "wallet_daily_stats"
+
+    wallet_id = Column(UUID(as_uuid=True), ForeignKey("wallets.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    operation_type = Column(SQLEnum(OperationType), primary_key=True)
+    total_amount = Column(Numeric(24, 2), nullable=False, default=0)
+    operation_count = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,225 @@
+"""
+Balance change notifications for the wallet service.
+A trigger on `wallets` publishes balance changes with NOTIFY, but only for
+wallets whose `notify_until` lease is in the future. Each worker holds one
+LISTEN connection, keeps the leases of its subscribed wallets renewed and fans
+the payloads out to its subscribers. Wallets nobody watches never pay for
+NOTIFY, which serializes commits on the notification queue lock.
+"""
+
+from uuid import UUID
+import asyncio
+import json
+import logging
+import asyncpg
+
+from .database import settings
+
+BALANCE_CHANNEL = "wallet_balance"
+
+
+class SubscriberLimitExceeded(Exception):
+    """Raised when a worker already serves MAX_SUBSCRIBERS streams"""
+
+
+class NotificationsUnavailable(Exception):
+    """Raised when the LISTEN connection cannot be opened or used"""
+
+
+class Subscriber:
+    """
+    A single client stream.
+    Payloads are queued up to `queue_size`; a subscriber whose queue is full
+    is closed with a resync instead of blocking delivery to everyone else.
+    A None in the queue marks the end of the stream; `resync` tells the client
+    that updates may have been missed and it should reconnect for a fresh
+    snapshot.
+    """
+
+    def __init__(self, wallet_ids: set[UUID], queue_size: int):
+        self.wallet_ids = wallet_ids
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=queue_size)
+        self.closed = asyncio.Event()
+        self.resync = False
+
+    def close(self) -> None:
+        """
+        Marks the stream closed and wakes its reader.
+        Pending payloads are discarded so the end marker always fits and the
+        reader stops at once instead of replaying a backlog.
+        """
+        self.closed.set()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    def offer(self, payload: str) -> bool:
+        """Queues a payload, returns False if the subscriber cannot keep up"""
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+
+class BalanceBroadcaster:
+    """
+    Per-worker fan-out of balance notifications.
+    The LISTEN connection is opened with the first subscriber; it goes
+    directly to PostgreSQL because LISTEN does not survive PgBouncer
+    transaction pooling. If it is lost, notifications sent in the meantime
+    are gone, so every current subscriber is closed with a resync and the
+    connection is reopened by the next subscribe.
+    """
+
+    def __init__(self, dsn: str, queue_size: int, max_subscribers: int, lease_seconds: float):
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.lease_seconds = lease_seconds
+        self.subscribers: dict[UUID, set[Subscriber]] = {}
+        self.subscriber_count = 0
+        self.dropped_count = 0
+        self._connection: asyncpg.Connection | None = None
+        self._lease_task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        # asyncpg connections run one query at a time
+        self._query_lock = asyncio.Lock()
+
+    async def subscribe(self, wallet_ids: set[UUID]) -> Subscriber:
+        """
+        Registers a subscriber for the given wallets.
+
+        Raises:
+            SubscriberLimitExceeded: If the worker is at MAX_SUBSCRIBERS
+            NotificationsUnavailable: If the LISTEN connection cannot be used
+        """
+        if self.subscriber_count >= self.max_subscribers:
+            raise SubscriberLimitExceeded()
+        try:
+            await self._ensure_listening()
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            raise NotificationsUnavailable() from e
+        subscriber = Subscriber(wallet_ids, self.queue_size)
+        for wallet_id in wallet_ids:
+            self.subscribers.setdefault(wallet_id, set()).add(subscriber)
+        self.subscriber_count += 1
+        try:
+            # The lease is committed before the caller reads its snapshot,
+            # so every later balance change is published
+            await self._renew_leases(list(wallet_ids))
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            self.unsubscribe(subscriber)
+            raise NotificationsUnavailable() from e
+        except Exception:
+            self.unsubscribe(subscriber)
+            raise
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Removes a subscriber; calling it twice is harmless"""
+        if subscriber.closed.is_set():
+            return
+        subscriber.close()
+        for wallet_id in subscriber.wallet_ids:
+            wallet_subscribers = self.subscribers.get(wallet_id)
+            if wallet_subscribers is None:
+                continue
+            wallet_subscribers.discard(subscriber)
+            if not wallet_subscribers:
+                del self.subscribers[wallet_id]
+        self.subscriber_count -= 1
+
+    def dispatch(self, payload: str) -> None:
+        """Delivers one notification payload to the subscribers of its wallet"""
+        try:
+            wallet_id = UUID(json.loads(payload)["id"])
+        except (ValueError, KeyError, TypeError):
+            logging.warning(f"Ignoring malformed balance notification: {payload}")
+            return
+        for subscriber in list(self.subscribers.get(wallet_id, ())):
+            if not subscriber.offer(payload):
+                self.dropped_count += 1
+                logging.warning("Dropping slow balance subscriber")
+                subscriber.resync = True
+                self.unsubscribe(subscriber)
+
+    async def stop(self) -> None:
+        """Closes the LISTEN connection and all subscriber streams"""
+        if self._lease_task is not None:
+            self._lease_task.cancel()
+            self._lease_task = None
+        self._close_all()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        self.dispatch(payload)
+
+    def _close_all(self, resync: bool = False) -> None:
+        for wallet_subscribers in list(self.subscribers.values()):
+            for subscriber in list(wallet_subscribers):
+                subscriber.resync = resync
+                self.unsubscribe(subscriber)
+
+    def _on_termination(self, connection) -> None:
+        if connection is not self._connection:
+            return
+        logging.warning(
+            f"Balance LISTEN connection lost - closing {self.subscriber_count} subscribers for resync"
+        )
+        self._connection = None
+        if self._lease_task is not None:
+            self._lease_task.cancel()
+            self._lease_task = None
+        self._close_all(resync=True)
+
+    async def _ensure_listening(self) -> None:
+        if self._connection is not None:
+            return
+        async with self._lock:
+            if self._connection is None:
+                await self._connect()
+
+    async def _connect(self) -> None:
+        connection = await asyncpg.connect(self.dsn)
+        connection.add_termination_listener(self._on_termination)
+        await connection.add_listener(BALANCE_CHANNEL, self._on_notification)
+        self._connection = connection
+        if self._lease_task is None:
+            self._lease_task = asyncio.create_task(self._renew_leases_forever())
+
+    async def _renew_leases(self, wallet_ids: list[UUID]) -> None:
+        """Extends the NOTIFY lease of the given wallets by lease_seconds"""
+        if self._connection is None:
+            raise asyncpg.InterfaceError("LISTEN connection is closed")
+        for start in range(0, len(wallet_ids), 1000):
+            async with self._query_lock:
+                await self._connection.execute(
+                    """
+                    UPDATE wallets
+                    SET notify_until = now() + make_interval(secs => $2)
+                    WHERE id = ANY($1::uuid[])
+                    """,
+                    wallet_ids[start:start + 1000],
+                    float(self.lease_seconds)
+                )
+
+    async def _renew_leases_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 2)
+            if not self.subscribers or self._connection is None:
+                continue
+            try:
+                await self._renew_leases(list(self.subscribers))
+            except Exception as e:
+                logging.warning(f"Renewing balance notification leases failed: {str(e)}")
+
+
+broadcaster = BalanceBroadcaster(
+    settings.LISTEN_DATABASE_URL,
+    settings.SUBSCRIBER_QUEUE_SIZE,
+    settings.MAX_SUBSCRIBERS,
+    settings.SUBSCRIPTION_LEASE_SECONDS
+)
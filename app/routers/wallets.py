@@ -1,54 +1,208 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
-from ..database import get_session
-from ..crud import create_wallet, get_wallet, update_wallet_balance
-from ..schemas import TransactionCreate, WalletResponse, TransactionResponse, TransactionStatus
+from ..database import settings, get_read_session, get_write_session, get_commit_lsn, get_sessionmaker
+from ..crud import create_wallet, get_wallet, get_wallets, get_daily_stats, update_wallet_balance
+from ..notifications import broadcaster, SubscriberLimitExceeded, NotificationsUnavailable
+from ..schemas import (
+    TransactionCreate, WalletResponse, TransactionResponse, TransactionStatus,
+    WalletLookupRequest, WalletLookupResponse, WalletStatsResponse, DailyStats
+)
+from ..models import OperationType
 import logging
 from asyncpg.exceptions import TooManyConnectionsError
-from datetime import datetime, UTC
+from datetime import date, datetime, timedelta, UTC
 from uuid import uuid4
 import traceback
 from sqlalchemy.exc import OperationalError
 import asyncio
+import json
 
 router = APIRouter()
 
+LOOKUP_BATCH_SIZE = 100
+
 @router.post("/", response_model=WalletResponse)
-async def create_new_wallet(session: AsyncSession = Depends(get_session)):
+async def create_new_wallet(session: AsyncSession = Depends(get_write_session)):
     """Create a new wallet with zero balance"""
     wallet = await create_wallet(session)
     return wallet
 
+@router.post("/lookup", response_model=WalletLookupResponse)
+async def lookup_wallets(
+    lookup: WalletLookupRequest,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Get several wallets with a single query.
+    Wallets are returned in request order; unknown IDs are listed in `missing`.
+    The response body is streamed wallet by wallet.
+    """
+    wallet_ids = list(dict.fromkeys(lookup.ids))
+    found = {wallet.id: wallet for wallet in await get_wallets(session, wallet_ids)}
+
+    async def body():
+        # Async and batched: a sync generator would cost one threadpool hop per chunk
+        yield '{"wallets":['
+        rows = [
+            WalletResponse.model_validate(found[wallet_id]).model_dump_json()
+            for wallet_id in wallet_ids if wallet_id in found
+        ]
+        for start in range(0, len(rows), LOOKUP_BATCH_SIZE):
+            separator = "," if start else ""
+            yield separator + ",".join(rows[start:start + LOOKUP_BATCH_SIZE])
+        missing = [str(wallet_id) for wallet_id in wallet_ids if wallet_id not in found]
+        yield '],"missing":' + json.dumps(missing) + '}'
+
+    return StreamingResponse(body(), media_type="application/json")
+
+@router.get("/events")
+async def subscribe_balances(wallet_id: list[UUID] = Query(...)):
+    """
+    Stream balance changes of the given wallets as Server-Sent Events.
+    The stream starts with the current balance of each existing wallet,
+    followed by a `balance` event for every committed change. If updates may
+    have been lost, a `resync` event is sent and the stream ends; reconnect
+    to get a fresh snapshot.
+    """
+    wallet_ids = set(wallet_id)
+    if len(wallet_ids) > settings.MAX_SUBSCRIPTION_WALLETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.MAX_SUBSCRIPTION_WALLETS} wallets per subscription"
+        )
+    try:
+        subscriber = await broadcaster.subscribe(wallet_ids)
+    except SubscriberLimitExceeded:
+        raise HTTPException(status_code=503, detail="Too many subscribers, please try again later")
+    except NotificationsUnavailable:
+        logging.error("Balance notifications unavailable", exc_info=True)
+        raise HTTPException(
+            status_code=503,
+            detail="Service temporarily unavailable. Please try again later."
+        )
+
+    try:
+        # Subscribing before the snapshot means no change can fall in between
+        async with get_sessionmaker()() as session:
+            wallets = await get_wallets(session, list(wallet_ids))
+    except Exception:
+        broadcaster.unsubscribe(subscriber)
+        raise
+
+    async def event_stream():
+        try:
+            for wallet in wallets:
+                payload = json.dumps({
+                    "id": str(wallet.id),
+                    "balance": f"{wallet.balance:.2f}",
+                    "updated_at": wallet.updated_at.isoformat()
+                })
+                yield f"event: balance\ndata: {payload}\n\n"
+            while True:
+                try:
+                    payload = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if subscriber.closed.is_set():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if payload is None:
+                    break
+                yield f"event: balance\ndata: {payload}\n\n"
+            if subscriber.resync:
+                yield "event: resync\ndata: {}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{wallet_id}", response_model=WalletResponse)
-async def get_wallet_info(wallet_id: UUID, session: AsyncSession = Depends(get_session)):
-    """Get wallet information"""
+async def get_wallet_info(wallet_id: UUID, session: AsyncSession = Depends(get_read_session)):
+    """
+    Get wallet information.
+    Served from the read replica when it is fresh enough; send the
+    X-Commit-LSN of a previous operation as X-Min-LSN to read your own writes.
+    """
     wallet = await get_wallet(session, wallet_id)
     if not wallet:
         raise HTTPException(status_code=404, detail="Wallet not found")
     return wallet
 
+@router.get("/{wallet_id}/stats", response_model=WalletStatsResponse)
+async def get_wallet_stats(
+    wallet_id: UUID,
+    date_from: date | None = Query(default=None, alias="from"),
+    date_to: date | None = Query(default=None, alias="to"),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Get daily deposit and withdrawal totals for an inclusive UTC date range
+    (default: the last 30 days). Apart from one primary key lookup to check
+    that the wallet exists, reads only the daily rollups, so the cost depends
+    on the range length, not on the wallet's history.
+    Days without operations are omitted.
+    """
+    date_to = date_to or datetime.now(UTC).date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (date_to - date_from).days >= settings.MAX_STATS_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date range must not exceed {settings.MAX_STATS_DAYS} days"
+        )
+
+    if not await get_wallet(session, wallet_id):
+        raise HTTPException(status_code=404, detail="Wallet not found")
+
+    days: dict[date, DailyStats] = {}
+    for row in await get_daily_stats(session, wallet_id, date_from, date_to):
+        stats = days.setdefault(row.day, DailyStats(day=row.day))
+        if row.operation_type == OperationType.DEPOSIT:
+            stats.deposit_amount = row.total_amount
+            stats.deposit_count = row.operation_count
+        else:
+            stats.withdraw_amount = row.total_amount
+            stats.withdraw_count = row.operation_count
+
+    return WalletStatsResponse(
+        wallet_id=wallet_id,
+        date_from=date_from,
+        date_to=date_to,
+        days=list(days.values())
+    )
+
 @router.post("/{wallet_id}/operation", response_model=TransactionResponse)
 async def process_operation(
     wallet_id: UUID,
     operation: TransactionCreate,
-    session: AsyncSession = Depends(get_session)
+    response: Response,
+    session: AsyncSession = Depends(get_write_session)
 ):
     try:
         for attempt in range(3):
             try:
-                _, amount = await update_wallet_balance(
-                    session, wallet_id, operation.operation_type, operation.amount
+                _, transaction = await update_wallet_balance(
+                    session, wallet_id, operation.operation_type, operation.amount,
+                    operation.durability
                 )
+                # The token only matters when reads can go to a replica
+                if settings.REPLICA_DATABASE_URL:
+                    try:
+                        response.headers["X-Commit-LSN"] = await get_commit_lsn(session)
+                    except Exception as e:
+                        # The operation is committed; only the read-your-writes token is lost
+                        logging.warning(f"Failed to read commit LSN: {str(e)}")
                 
-                return TransactionResponse(
-                    id=uuid4(),
-                    wallet_id=wallet_id,
-                    amount=amount,
-                    operation_type=operation.operation_type,
-                    status=TransactionStatus.SUCCESS,
-                    created_at=datetime.now(UTC)
-                )
+                return TransactionResponse.model_validate(transaction)
             except (TooManyConnectionsError, OperationalError) as e:
                 if attempt == 2:
                     logging.error(f"Database error after retries: {str(e)}")
@@ -58,6 +212,7 @@ async def process_operation(
                         amount=operation.amount,
                         operation_type=operation.operation_type,
                         status=TransactionStatus.FAILED,
+                        durability=operation.durability,
                         created_at=datetime.now(UTC)
                     )
                 await asyncio.sleep(0.1 * (2 ** attempt))
@@ -76,5 +231,6 @@ async def process_operation(
             amount=operation.amount,
             operation_type=operation.operation_type,
             status=TransactionStatus.FAILED,
+            durability=operation.durability,
             created_at=datetime.now(UTC)
         )
@@ -1,8 +1,9 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from uuid import UUID
 from pydantic import BaseModel, Field, ConfigDict
-from .models import OperationType, TransactionStatus
+from .models import OperationType, TransactionStatus, DurabilityTier
+from .database import settings
 from enum import Enum
 
 class WalletBase(BaseModel):
@@ -24,12 +25,41 @@ class WalletResponse(WalletBase):
         }
     )
 
+class WalletLookupRequest(BaseModel):
+    # Hard cap checked while parsing, before ids are deduplicated or queried
+    ids: list[UUID] = Field(min_length=1, max_length=settings.MAX_LOOKUP_WALLETS)
+
+class WalletLookupResponse(BaseModel):
+    wallets: list[WalletResponse]
+    missing: list[UUID]
+
+class DailyStats(BaseModel):
+    day: date
+    deposit_amount: Decimal = Decimal("0")
+    deposit_count: int = 0
+    withdraw_amount: Decimal = Decimal("0")
+    withdraw_count: int = 0
+
+    # Totals can exceed float precision, so format the Decimal directly
+    model_config = ConfigDict(
+        json_encoders={
+            Decimal: lambda v: f"{v:.2f}"
+        }
+    )
+
+class WalletStatsResponse(BaseModel):
+    wallet_id: UUID
+    date_from: date
+    date_to: date
+    days: list[DailyStats]
+
 class TransactionBase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 class TransactionCreate(TransactionBase):
     operation_type: OperationType
     amount: Decimal = Field(gt=0, le=Decimal('9999999999999999.99'))
+    durability: DurabilityTier = DurabilityTier.STRICT
 
 class TransactionResponse(TransactionBase):
     id: UUID
@@ -37,6 +67,7 @@ class TransactionResponse(TransactionBase):
     operation_type: OperationType
     amount: Decimal
     status: TransactionStatus
+    durability: DurabilityTier = DurabilityTier.STRICT
     created_at: datetime
 
 class TransactionStatus(str, Enum):
@@ -0,0 +1,314 @@
+"""
+PgBouncer and PostgreSQL telemetry collector for the wallet service.
+
+Polls the PgBouncer admin console (SHOW POOLS/DATABASES/STATS) and the
+PostgreSQL statistics views (pg_stat_activity, pg_stat_user_tables, pg_locks),
+turns cumulative counters into per-interval rates and serves the result in
+Prometheus text format on /metrics.
+
+Overhead per interval (TELEMETRY_INTERVAL_SECONDS, default 5s):
+- one persistent connection to the PgBouncer admin console, 3 SHOW commands
+- one persistent connection directly to PostgreSQL, 4 catalog queries,
+  each capped by a 1s statement_timeout; pg_blocking_pids() is only
+  evaluated for backends that are currently waiting on a lock
+No connections are opened per poll, so the collector holds exactly one
+PostgreSQL backend and never competes for a PgBouncer server slot.
+
+Usage:
+    python -m app.telemetry
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import threading
+import time
+import psycopg2
+import psycopg2.extras
+
+from .database import settings
+
+POOL_GAUGES = {
+    "cl_active": "pgbouncer_pool_clients_active",
+    "cl_waiting": "pgbouncer_pool_clients_waiting",
+    "sv_active": "pgbouncer_pool_servers_active",
+    "sv_idle": "pgbouncer_pool_servers_idle",
+    "sv_used": "pgbouncer_pool_servers_used",
+}
+
+ACTIVITY_QUERY = """
+    SELECT
+        COALESCE(state, 'unknown') AS state,
+        count(*) AS connections,
+        count(*) FILTER (WHERE wait_event_type = 'Lock') AS lock_waiters,
+        COALESCE(max(EXTRACT(EPOCH FROM now() - xact_start)), 0) AS oldest_xact_seconds
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND pid <> pg_backend_pid()
+    GROUP BY 1
+"""
+
+TABLES_QUERY = """
+    SELECT relname, n_tup_ins, n_tup_upd, n_tup_hot_upd, n_live_tup, n_dead_tup, seq_scan
+    FROM pg_stat_user_tables
+"""
+
+LOCKS_QUERY = """
+    SELECT
+        l.locktype,
+        CASE
+            WHEN l.database = (SELECT oid FROM pg_database WHERE datname = current_database())
+            THEN COALESCE(l.relation::regclass::text, '')
+            ELSE ''
+        END AS relation,
+        count(*) AS waiting
+    FROM pg_locks l
+    JOIN pg_stat_activity a ON a.pid = l.pid
+    WHERE NOT l.granted AND a.datname = current_database()
+    GROUP BY 1, 2
+"""
+
+# A backend blocked on a wallets row usually waits on the holder's transactionid,
+# which carries no relation, so waiters are attributed through their blockers
+WALLETS_LOCK_WAITS_QUERY = """
+    SELECT count(DISTINCT waiter.pid) AS waiting
+    FROM pg_stat_activity waiter
+    JOIN pg_locks held ON held.pid = ANY(pg_blocking_pids(waiter.pid))
+    WHERE waiter.datname = current_database()
+      AND waiter.wait_event_type = 'Lock'
+      AND held.granted
+      AND held.database = (SELECT oid FROM pg_database WHERE datname = current_database())
+      AND held.relation = to_regclass('public.wallets')
+"""
+
+
+def _rate(current: float, previous: float | None, elapsed: float) -> float | None:
+    if previous is None or elapsed <= 0 or current < previous:
+        # No baseline yet, or the counter was reset
+        return None
+    return (current - previous) / elapsed
+
+
+def compute_metrics(previous: dict | None, current: dict) -> list[tuple[str, dict, float]]:
+    """
+    Derives gauges and rates from two consecutive samples.
+
+    Args:
+        previous: Sample from the previous poll, or None on the first poll
+        current: Sample from this poll
+
+    Returns:
+        List of (metric name, labels, value)
+    """
+    metrics = []
+    elapsed = current["time"] - previous["time"] if previous else 0.0
+
+    pool_sizes = {row["name"]: row["pool_size"] for row in current["databases"]}
+    for row in current["pools"]:
+        labels = {"database": row["database"], "user": row["user"]}
+        for column, name in POOL_GAUGES.items():
+            metrics.append((name, labels, float(row[column])))
+        maxwait = row["maxwait"] + row.get("maxwait_us", 0) / 1_000_000
+        metrics.append(("pgbouncer_pool_maxwait_seconds", labels, float(maxwait)))
+        pool_size = pool_sizes.get(row["database"])
+        if pool_size:
+            saturation = (row["sv_active"] + row["cl_waiting"]) / pool_size
+            metrics.append(("pgbouncer_pool_saturation", labels, float(saturation)))
+
+    previous_stats = {row["database"]: row for row in previous["stats"]} if previous else {}
+    for row in current["stats"]:
+        labels = {"database": row["database"]}
+        before = previous_stats.get(row["database"], {})
+        xact_rate = _rate(row["total_xact_count"], before.get("total_xact_count"), elapsed)
+        query_rate = _rate(row["total_query_count"], before.get("total_query_count"), elapsed)
+        wait_rate = _rate(row["total_wait_time"], before.get("total_wait_time"), elapsed)
+        if xact_rate is not None:
+            metrics.append(("pgbouncer_transactions_per_second", labels, xact_rate))
+        if query_rate is not None:
+            metrics.append(("pgbouncer_queries_per_second", labels, query_rate))
+        if wait_rate is not None:
+            # total_wait_time is in microseconds
+            metrics.append(("pgbouncer_client_wait_seconds_per_second", labels, wait_rate / 1_000_000))
+            if xact_rate:
+                metrics.append((
+                    "pgbouncer_client_wait_seconds_per_transaction",
+                    labels,
+                    wait_rate / xact_rate / 1_000_000
+                ))
+
+    lock_waiters = 0
+    oldest_xact = 0.0
+    for row in current["activity"]:
+        metrics.append(("pg_connections", {"state": row["state"]}, float(row["connections"])))
+        lock_waiters += row["lock_waiters"]
+        oldest_xact = max(oldest_xact, float(row["oldest_xact_seconds"]))
+    metrics.append(("pg_lock_waiting_backends", {}, float(lock_waiters)))
+    metrics.append(("pg_oldest_transaction_seconds", {}, oldest_xact))
+
+    for row in current["locks"]:
+        labels = {"locktype": row["locktype"], "relation": row["relation"]}
+        metrics.append(("pg_locks_waiting", labels, float(row["waiting"])))
+    metrics.append(("pg_wallets_lock_waits", {}, float(current["wallets_lock_waits"])))
+
+    previous_tables = {row["relname"]: row for row in previous["tables"]} if previous else {}
+    for row in current["tables"]:
+        labels = {"table": row["relname"]}
+        before = previous_tables.get(row["relname"], {})
+        metrics.append(("pg_table_live_tuples", labels, float(row["n_live_tup"])))
+        metrics.append(("pg_table_dead_tuples", labels, float(row["n_dead_tup"])))
+        for column, name in (
+            ("n_tup_ins", "pg_table_inserts_per_second"),
+            ("n_tup_upd", "pg_table_updates_per_second"),
+            ("seq_scan", "pg_table_seq_scans_per_second"),
+        ):
+            rate = _rate(row[column], before.get(column), elapsed)
+            if rate is not None:
+                metrics.append((name, labels, rate))
+        updates = _rate(row["n_tup_upd"], before.get("n_tup_upd"), elapsed)
+        hot_updates = _rate(row["n_tup_hot_upd"], before.get("n_tup_hot_upd"), elapsed)
+        if updates and hot_updates is not None:
+            metrics.append(("pg_table_hot_update_ratio", labels, hot_updates / updates))
+
+    return metrics
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(metrics: list[tuple[str, dict, float]]) -> str:
+    """Formats metrics in Prometheus text exposition format"""
+    lines = []
+    seen = set()
+    for name, labels, value in sorted(metrics, key=lambda m: m[0]):
+        if name not in seen:
+            lines.append(f"# TYPE {name} gauge")
+            seen.add(name)
+        if labels:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+        else:
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class TelemetryCollector:
+    """
+    Polls PgBouncer and PostgreSQL on two long-lived connections.
+    A failed poll closes both connections; they are reopened on the next poll.
+    """
+
+    def __init__(self, pgbouncer_dsn: str, database_dsn: str, interval: float):
+        self.pgbouncer_dsn = pgbouncer_dsn
+        self.database_dsn = database_dsn
+        self.interval = interval
+        self.previous: dict | None = None
+        self.scrape_errors = 0
+        self.output = ""
+        self._pgbouncer = None
+        self._database = None
+
+    def _connect(self):
+        if self._pgbouncer is None:
+            # The admin console only accepts simple queries outside transactions
+            self._pgbouncer = psycopg2.connect(self.pgbouncer_dsn)
+            self._pgbouncer.autocommit = True
+        if self._database is None:
+            self._database = psycopg2.connect(
+                self.database_dsn,
+                application_name="wallet_telemetry",
+                options="-c statement_timeout=1000"
+            )
+            self._database.autocommit = True
+
+    def _close(self):
+        for connection in (self._pgbouncer, self._database):
+            if connection is not None:
+                try:
+                    connection.close()
+                except psycopg2.Error:
+                    pass
+        self._pgbouncer = self._database = None
+
+    @staticmethod
+    def _fetch(connection, query: str) -> list[dict]:
+        with connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.execute(query)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def sample(self) -> dict:
+        """Reads one raw sample from PgBouncer and PostgreSQL"""
+        self._connect()
+        return {
+            "time": time.monotonic(),
+            "pools": [
+                row for row in self._fetch(self._pgbouncer, "SHOW POOLS")
+                if row["database"] != "pgbouncer"
+            ],
+            "databases": self._fetch(self._pgbouncer, "SHOW DATABASES"),
+            "stats": [
+                row for row in self._fetch(self._pgbouncer, "SHOW STATS")
+                if row["database"] != "pgbouncer"
+            ],
+            "activity": self._fetch(self._database, ACTIVITY_QUERY),
+            "tables": self._fetch(self._database, TABLES_QUERY),
+            "locks": self._fetch(self._database, LOCKS_QUERY),
+            "wallets_lock_waits": self._fetch(self._database, WALLETS_LOCK_WAITS_QUERY)[0]["waiting"],
+        }
+
+    def poll(self) -> None:
+        """Takes a sample and refreshes the rendered metrics"""
+        start_time = time.monotonic()
+        try:
+            current = self.sample()
+        except psycopg2.Error as e:
+            logging.warning(f"Telemetry poll failed: {str(e)}")
+            self.scrape_errors += 1
+            self.previous = None
+            self._close()
+            return
+        metrics = compute_metrics(self.previous, current)
+        self.previous = current
+        metrics.append(("wallet_telemetry_scrape_duration_seconds", {}, time.monotonic() - start_time))
+        metrics.append(("wallet_telemetry_scrape_errors", {}, float(self.scrape_errors)))
+        self.output = render(metrics)
+
+    def run(self) -> None:
+        """Polls forever at the configured interval"""
+        while True:
+            started = time.monotonic()
+            self.poll()
+            time.sleep(max(self.interval - (time.monotonic() - started), 0))
+
+
+def serve(collector: TelemetryCollector, port: int) -> ThreadingHTTPServer:
+    """Starts a background HTTP server exposing the collector output on /metrics"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = collector.output.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    collector = TelemetryCollector(
+        settings.PGBOUNCER_ADMIN_DSN,
+        settings.TELEMETRY_DATABASE_DSN,
+        settings.TELEMETRY_INTERVAL_SECONDS
+    )
+    serve(collector, settings.TELEMETRY_PORT)
+    logging.info(f"Serving telemetry on :{settings.TELEMETRY_PORT}/metrics")
+    collector.run()
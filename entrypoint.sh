@@ -1,5 +1,12 @@
 #!/bin/bash
 
+# MIGRATION_MODE controls Liquibase on startup:
+#   auto   - run Liquibase only if the changelog checksum differs from the one tagged in databasechangelog
+#   always - run Liquibase on every start
+#   skip   - never run Liquibase
+MIGRATION_MODE=${MIGRATION_MODE:-auto}
+export LIQUIBASE_CHANGELOG=/liquibase/changelog/changelog.xml
+
 # Waiting for the database to be available through pgbouncer
 until PGPASSWORD=${POSTGRES_PASSWORD} psql -h db -U ${POSTGRES_USER} -d ${POSTGRES_DB} -c '\q'; do
   echo "PostgreSQL is unavailable - sleeping"
@@ -14,30 +21,65 @@ until PGPASSWORD=${POSTGRES_PASSWORD} psql -h pgbouncer -p 6432 -U ${POSTGRES_US
   sleep 1
 done
 
-echo "PgBouncer is up - executing migrations"
-
-# Running migrations directly through PostgreSQL
-cd /liquibase
-liquibase \
-  --changelog-file=changelog/changelog.xml \
-  --url=jdbc:postgresql://db:5432/${POSTGRES_DB} \
-  --username=${POSTGRES_USER} \
-  --password=${POSTGRES_PASSWORD} \
-  update
-
-# Checking the success of migrations
-until PGPASSWORD=${POSTGRES_PASSWORD} psql -h db -U ${POSTGRES_USER} -d ${POSTGRES_DB} -c "SELECT count(*) FROM public.databasechangeloglock;" > /dev/null 2>&1; do
-  echo "Waiting for migrations to complete..."
-  sleep 2
-done
+run_migrations() {
+  echo "PgBouncer is up - executing migrations"
 
-# Checking the availability of PgBouncer after migrations
-until PGPASSWORD=${POSTGRES_PASSWORD} psql -h pgbouncer -p 6432 -U ${POSTGRES_USER} -d ${POSTGRES_DB} -c '\q'; do
-  echo "PgBouncer is not ready - waiting..."
-  sleep 1
-done
+  # Running migrations directly through PostgreSQL
+  cd /liquibase
+  liquibase \
+    --changelog-file=changelog/changelog.xml \
+    --url=jdbc:postgresql://db:5432/${POSTGRES_DB} \
+    --username=${POSTGRES_USER} \
+    --password=${POSTGRES_PASSWORD} \
+    update || exit 1
+
+  # Recording the changelog checksum so the next start can skip the JVM run
+  liquibase \
+    --url=jdbc:postgresql://db:5432/${POSTGRES_DB} \
+    --username=${POSTGRES_USER} \
+    --password=${POSTGRES_PASSWORD} \
+    tag --tag="$(cd /app && python -m app.migrations checksum)"
+
+  # Checking the success of migrations
+  until PGPASSWORD=${POSTGRES_PASSWORD} psql -h db -U ${POSTGRES_USER} -d ${POSTGRES_DB} -c "SELECT count(*) FROM public.databasechangeloglock;" > /dev/null 2>&1; do
+    echo "Waiting for migrations to complete..."
+    sleep 2
+  done
+
+  # Checking the availability of PgBouncer after migrations
+  until PGPASSWORD=${POSTGRES_PASSWORD} psql -h pgbouncer -p 6432 -U ${POSTGRES_USER} -d ${POSTGRES_DB} -c '\q'; do
+    echo "PgBouncer is not ready - waiting..."
+    sleep 1
+  done
+
+  echo "Migrations completed"
+}
+
+cd /app
+case "$MIGRATION_MODE" in
+  always)
+    run_migrations
+    ;;
+  skip)
+    echo "MIGRATION_MODE=skip - not running migrations"
+    ;;
+  *)
+    if python -m app.migrations check; then
+      echo "Schema matches changelog - skipping migrations"
+    else
+      run_migrations
+    fi
+    ;;
+esac
+
+echo "Starting application"
 
-echo "Migrations completed - starting application"
+# Every balance subscription holds a connection that uvicorn counts against
+# --limit-concurrency for its whole life, so the limit is MAX_SUBSCRIBERS plus
+# API_CONCURRENCY connections kept free for regular requests
+MAX_SUBSCRIBERS=${MAX_SUBSCRIBERS:-1000}
+API_CONCURRENCY=${API_CONCURRENCY:-400}
+export MAX_SUBSCRIBERS
 
 cd /app
-uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers 12 --loop uvloop --http httptools --backlog 2048 --limit-concurrency 400 
\ No newline at end of file
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers 12 --loop uvloop --http httptools --backlog 2048 --limit-concurrency $((MAX_SUBSCRIBERS + API_CONCURRENCY))
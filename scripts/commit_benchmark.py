@@ -0,0 +1,68 @@
+"""
+Benchmarks balance commits per second for each durability tier.
+
+Each worker deposits into its own wallet, so row locks do not serialize the
+workers and the measurement is dominated by commit cost. Run it against the
+database configured with the repository's postgresql.conf.
+
+With --compare-notify every tier is also run with the wallets' notification
+lease set, so the balance trigger issues NOTIFY on each commit, showing what
+an active subscription costs in commit throughput.
+
+Usage:
+    python -m scripts.commit_benchmark --workers 32 --duration 20 --compare-notify
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from decimal import Decimal
+from sqlalchemy import text
+
+from app.crud import create_wallet, update_wallet_balance
+from app.database import get_sessionmaker, dispose_engines
+from app.models import OperationType, DurabilityTier
+
+async def worker(tier: DurabilityTier, notify: bool, deadline: float, latencies: list[float]):
+    sessionmaker = get_sessionmaker()
+    async with sessionmaker() as session:
+        wallet = await create_wallet(session)
+        if notify:
+            await session.execute(
+                text("UPDATE wallets SET notify_until = now() + interval '1 hour' WHERE id = :id"),
+                {"id": wallet.id}
+            )
+            await session.commit()
+    while time.monotonic() < deadline:
+        start_time = time.monotonic()
+        async with sessionmaker() as session:
+            await update_wallet_balance(
+                session, wallet.id, OperationType.DEPOSIT, Decimal("1.00"), tier
+            )
+        latencies.append(time.monotonic() - start_time)
+
+async def run_tier(tier: DurabilityTier, notify: bool, workers: int, duration: float):
+    latencies: list[float] = []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*[worker(tier, notify, deadline, latencies) for _ in range(workers)])
+    latencies.sort()
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    print(f"{tier.value:<13} {'notify' if notify else 'no notify':<10} "
+          f"{len(latencies) / duration:>10.0f} commits/s  "
+          f"p50 {statistics.median(latencies) * 1000:6.2f}ms  p99 {p99 * 1000:6.2f}ms")
+
+async def main(args):
+    try:
+        for tier in DurabilityTier:
+            for notify in ((False, True) if args.compare_notify else (False,)):
+                await run_tier(tier, notify, args.workers, args.duration)
+    finally:
+        await dispose_engines()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--compare-notify", action="store_true", help="also run with the NOTIFY trigger firing")
+    asyncio.run(main(parser.parse_args()))
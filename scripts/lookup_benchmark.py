@@ -0,0 +1,62 @@
+"""
+Compares batch wallet lookup with a fan-out of single-wallet GETs.
+
+For each batch size the script times one POST /api/v1/wallets/lookup and the
+same wallets fetched with concurrent GET /api/v1/wallets/{id} calls.
+
+Usage:
+    python scripts/lookup_benchmark.py --url http://localhost:8000 --sizes 1 100 1000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+async def create_wallets(client: httpx.AsyncClient, url: str, count: int) -> list[str]:
+    wallet_ids = []
+    for start in range(0, count, 100):
+        responses = await asyncio.gather(*[
+            client.post(f"{url}/api/v1/wallets/") for _ in range(min(100, count - start))
+        ])
+        wallet_ids.extend(response.json()["id"] for response in responses)
+    return wallet_ids
+
+async def time_lookup(client: httpx.AsyncClient, url: str, wallet_ids: list[str]) -> float:
+    start_time = time.monotonic()
+    response = await client.post(f"{url}/api/v1/wallets/lookup", json={"ids": wallet_ids})
+    response.raise_for_status()
+    assert len(response.json()["wallets"]) == len(wallet_ids)
+    return time.monotonic() - start_time
+
+async def time_fan_out(client: httpx.AsyncClient, url: str, wallet_ids: list[str]) -> float:
+    start_time = time.monotonic()
+    responses = await asyncio.gather(*[
+        client.get(f"{url}/api/v1/wallets/{wallet_id}") for wallet_id in wallet_ids
+    ])
+    for response in responses:
+        response.raise_for_status()
+    return time.monotonic() - start_time
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        wallet_ids = await create_wallets(client, args.url, max(args.sizes))
+        print(f"{'ids':>6} {'lookup p50':>12} {'fan-out p50':>12} {'speedup':>8}")
+        for size in args.sizes:
+            batch = wallet_ids[:size]
+            lookup = [await time_lookup(client, args.url, batch) for _ in range(args.repeat)]
+            fan_out = [await time_fan_out(client, args.url, batch) for _ in range(args.repeat)]
+            lookup_p50 = statistics.median(lookup)
+            fan_out_p50 = statistics.median(fan_out)
+            print(f"{size:>6} {lookup_p50 * 1000:>10.1f}ms {fan_out_p50 * 1000:>10.1f}ms "
+                  f"{fan_out_p50 / lookup_p50:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=100, help="connections used by the GET fan-out")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,73 @@
+"""
+Measures application cold-start time: from process launch to the first
+successful request.
+
+The wallet lookup used as the probe goes through the database, so a 404 for
+the all-zero wallet id counts as success.
+
+Usage:
+    python scripts/measure_cold_start.py [--runs 3] [--url URL] [-- COMMAND...]
+
+Example:
+    python scripts/measure_cold_start.py --runs 5 -- ./entrypoint.sh
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+DEFAULT_URL = "http://localhost:8000/api/v1/wallets/00000000-0000-0000-0000-000000000000"
+DEFAULT_COMMAND = [
+    "uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000",
+    "--workers", "12", "--loop", "uvloop", "--http", "httptools"
+]
+
+def probe(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status == 200
+    except urllib.error.HTTPError as e:
+        return e.code == 404
+    except OSError:
+        return False
+
+def measure(command: list[str], url: str, timeout: float) -> float:
+    start_time = time.monotonic()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.monotonic() - start_time < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Process exited with code {process.returncode}")
+            if probe(url):
+                return time.monotonic() - start_time
+            time.sleep(0.05)
+        raise TimeoutError(f"No successful request within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("command", nargs="*", default=DEFAULT_COMMAND)
+    args = parser.parse_args()
+
+    timings = []
+    for run in range(args.runs):
+        elapsed = measure(args.command, args.url, args.timeout)
+        timings.append(elapsed)
+        print(f"run {run + 1}: {elapsed:.2f}s")
+    print(f"median: {statistics.median(timings):.2f}s  min: {min(timings):.2f}s  max: {max(timings):.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Load test for the balance subscription endpoint.
+
+Opens many concurrent SSE subscriptions against a single worker while a writer
+deposits into the subscribed wallets, then reports how many streams stayed
+connected, how many were dropped as slow consumers and the delivery latency
+from deposit response to event receipt.
+
+Start a single worker with the flags from entrypoint.sh, where
+--limit-concurrency is MAX_SUBSCRIBERS + API_CONCURRENCY (1000 + 400 by default):
+    MAX_SUBSCRIBERS=1000 uvicorn app.main:app --port 8000 --workers 1 --loop uvloop \
+        --http httptools --backlog 2048 --limit-concurrency 1400
+
+Usage:
+    python scripts/subscriber_load.py --subscribers 1000 --wallets 200 --rate 200 --duration 30
+
+Deposits rejected while the streams are open mean subscribers are starving
+the regular API.
+
+Raise the open file limit (`ulimit -n`) above the subscriber count.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import httpx
+
+class Stats:
+    def __init__(self):
+        self.connected = 0
+        self.ended = 0
+        self.failed = 0
+        self.events = 0
+        self.deposits = 0
+        self.deposits_rejected = 0
+        self.latencies: list[float] = []
+        self.last_deposit: dict[str, float] = {}
+
+async def subscriber(client: httpx.AsyncClient, base_url: str, wallet_id: str, stats: Stats, stop: asyncio.Event):
+    try:
+        async with client.stream("GET", f"{base_url}/api/v1/wallets/events", params={"wallet_id": wallet_id}) as response:
+            if response.status_code != 200:
+                stats.failed += 1
+                return
+            stats.connected += 1
+            snapshot_seen = False
+            async for line in response.aiter_lines():
+                if stop.is_set():
+                    return
+                if not line.startswith("data:"):
+                    continue
+                if not snapshot_seen:
+                    snapshot_seen = True
+                    continue
+                stats.events += 1
+                sent_at = stats.last_deposit.get(wallet_id)
+                if sent_at is not None:
+                    stats.latencies.append(time.monotonic() - sent_at)
+            stats.ended += 1
+    except httpx.HTTPError:
+        stats.failed += 1
+
+async def writer(client: httpx.AsyncClient, base_url: str, wallet_ids: list[str], rate: float, stats: Stats, stop: asyncio.Event):
+    interval = 1.0 / rate
+    while not stop.is_set():
+        wallet_id = random.choice(wallet_ids)
+        response = await client.post(
+            f"{base_url}/api/v1/wallets/{wallet_id}/operation",
+            json={"operation_type": "DEPOSIT", "amount": "1.00"}
+        )
+        if response.status_code == 200:
+            stats.deposits += 1
+            stats.last_deposit[wallet_id] = time.monotonic()
+        else:
+            stats.deposits_rejected += 1
+        await asyncio.sleep(interval)
+
+async def run(args):
+    stats = Stats()
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(None, connect=30.0)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client, \
+            httpx.AsyncClient(timeout=10.0) as writer_client:
+        wallet_ids = []
+        for _ in range(args.wallets):
+            response = await writer_client.post(f"{args.url}/api/v1/wallets/")
+            wallet_ids.append(response.json()["id"])
+
+        tasks = [
+            asyncio.create_task(subscriber(client, args.url, wallet_ids[i % len(wallet_ids)], stats, stop))
+            for i in range(args.subscribers)
+        ]
+        while stats.connected + stats.failed < args.subscribers:
+            await asyncio.sleep(0.5)
+            print(f"connecting: {stats.connected} connected, {stats.failed} failed")
+
+        write_task = asyncio.create_task(writer(writer_client, args.url, wallet_ids, args.rate, stats, stop))
+        await asyncio.sleep(args.duration)
+        stop.set()
+        write_task.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(write_task, *tasks, return_exceptions=True)
+
+    print(f"subscribers: {args.subscribers} requested, {stats.connected} connected, "
+          f"{stats.failed} failed, {stats.ended} ended early (dropped)")
+    print(f"deposits: {stats.deposits} accepted, {stats.deposits_rejected} rejected")
+    print(f"events delivered: {stats.events} ({stats.events / args.duration:.0f}/s)")
+    if stats.latencies:
+        latencies = sorted(stats.latencies)
+        p99 = latencies[int(len(latencies) * 0.99) - 1] if len(latencies) >= 100 else latencies[-1]
+        print(f"delivery latency: p50 {statistics.median(latencies) * 1000:.1f}ms  p99 {p99 * 1000:.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--wallets", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=100.0, help="deposits per second")
+    parser.add_argument("--duration", type=float, default=30.0)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
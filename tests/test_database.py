@@ -1,5 +1,7 @@
 import pytest
-from app.database import get_session, monitored_session, get_engine
+from app.database import get_session, monitored_session, get_engine, parse_lsn, ReplicaMonitor
+from app import database
+from app.migrations import changelog_checksum, TAG_PREFIX
 from unittest.mock import patch
 from sqlalchemy.sql import text
 from sqlalchemy.exc import OperationalError
@@ -112,3 +114,83 @@ async def test_pgbouncer_connection():
             result = await trans_conn.execute(text("SELECT 1"))
             value = result.scalar_one()
             assert value == 1
+
+def test_parse_lsn():
+    """Test conversion of textual LSNs to comparable integers"""
+    assert parse_lsn("0/0") == 0
+    assert parse_lsn("0/16B3748") == 0x16B3748
+    assert parse_lsn("1/0") > parse_lsn("0/FFFFFFFF")
+    with pytest.raises(ValueError):
+        parse_lsn("not-an-lsn")
+
+def test_replica_routing_decision():
+    """Test that stale or lagging replicas are not used for reads"""
+    monitor = ReplicaMonitor(None, max_lag=1.0, check_interval=0.5)
+    # Never probed or probe failed
+    assert not monitor.can_serve()
+
+    monitor.lag = 0.2
+    monitor.replay_lsn = parse_lsn("0/2000")
+    assert monitor.can_serve()
+    assert monitor.can_serve(parse_lsn("0/1000"))
+    # Replica has not replayed the client's commit yet
+    assert not monitor.can_serve(parse_lsn("0/3000"))
+
+    monitor.lag = 5.0
+    assert not monitor.can_serve()
+
+def test_engines_created_lazily():
+    """Test that engines are built once per process on first use"""
+    database.init_engines()
+    sessionmaker = database.async_session
+    assert sessionmaker is not None
+    database.init_engines()
+    assert database.get_sessionmaker() is sessionmaker
+
+def test_changelog_checksum(tmp_path):
+    """Test that the changelog checksum fits a Liquibase tag and tracks file contents"""
+    changelog = tmp_path / "changelog.xml"
+    changelog.write_text("<databaseChangeLog/>")
+    checksum = changelog_checksum(str(changelog))
+    assert checksum.startswith(TAG_PREFIX)
+    assert len(checksum) <= 255
+    assert changelog_checksum(str(changelog)) == checksum
+
+    changelog.write_text("<databaseChangeLog><changeSet/></databaseChangeLog>")
+    assert changelog_checksum(str(changelog)) != checksum
+
+@pytest.mark.asyncio
+async def test_replica_probe_timeout():
+    """Test that a hanging replica is marked unavailable without stalling readers"""
+    class HangingSession:
+        async def __aenter__(self):
+            await asyncio.sleep(3600)
+
+        async def __aexit__(self, *args):
+            pass
+
+    monitor = ReplicaMonitor(HangingSession, max_lag=1.0, check_interval=0.5, probe_timeout=0.1)
+    monitor.lag = 0.0
+
+    probe = asyncio.create_task(monitor.ensure_fresh())
+    await asyncio.sleep(0)
+    # A second reader does not wait for the probe in flight
+    await asyncio.wait_for(monitor.ensure_fresh(), timeout=0.05)
+
+    await asyncio.wait_for(probe, timeout=1.0)
+    assert not monitor.can_serve()
+
+@pytest.mark.asyncio
+async def test_replica_not_streaming():
+    """Test that a replica whose WAL receiver is down is not used, even with nothing left to replay"""
+    monitor = ReplicaMonitor(None, max_lag=1.0, check_interval=0.5)
+
+    async def probe():
+        # What _probe returns when pg_stat_wal_receiver is not 'streaming'
+        return "0/2000", None
+
+    with patch.object(monitor, "_probe", probe):
+        await monitor.refresh()
+    assert monitor.replay_lsn == parse_lsn("0/2000")
+    assert not monitor.can_serve()
+    assert not monitor.can_serve(parse_lsn("0/1000"))
@@ -0,0 +1,138 @@
+import pytest
+import json
+from contextlib import contextmanager
+from uuid import uuid4
+from unittest.mock import patch, AsyncMock, MagicMock
+import asyncpg
+from app.notifications import BalanceBroadcaster, SubscriberLimitExceeded, NotificationsUnavailable
+
+def make_broadcaster(queue_size=2, max_subscribers=10):
+    return BalanceBroadcaster("postgresql://unused", queue_size, max_subscribers, lease_seconds=60)
+
+@contextmanager
+def without_database():
+    with patch.object(BalanceBroadcaster, "_ensure_listening", AsyncMock()), \
+            patch.object(BalanceBroadcaster, "_renew_leases", AsyncMock()):
+        yield
+
+def payload(wallet_id, balance="10.00"):
+    return json.dumps({"id": str(wallet_id), "balance": balance, "updated_at": "2024-01-01T00:00:00+00:00"})
+
+@pytest.mark.asyncio
+async def test_fan_out_to_wallet_subscribers():
+    """Test that a notification reaches only subscribers of its wallet"""
+    broadcaster = make_broadcaster()
+    wallet_a, wallet_b = uuid4(), uuid4()
+    with without_database():
+        sub_a = await broadcaster.subscribe({wallet_a})
+        sub_ab = await broadcaster.subscribe({wallet_a, wallet_b})
+
+    broadcaster.dispatch(payload(wallet_b))
+    assert sub_a.queue.empty()
+    assert sub_ab.queue.get_nowait() == payload(wallet_b)
+
+    broadcaster.dispatch(payload(wallet_a))
+    assert sub_a.queue.qsize() == 1
+    assert sub_ab.queue.qsize() == 1
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_dropped():
+    """Test that a subscriber with a full queue is dropped without affecting others"""
+    broadcaster = make_broadcaster(queue_size=2)
+    wallet_id = uuid4()
+    with without_database():
+        slow = await broadcaster.subscribe({wallet_id})
+        fast = await broadcaster.subscribe({wallet_id})
+
+    for i in range(3):
+        broadcaster.dispatch(payload(wallet_id, f"{i}.00"))
+        while not fast.queue.empty():
+            fast.queue.get_nowait()
+
+    assert slow.closed.is_set()
+    assert slow.resync
+    # The backlog is discarded so the reader reaches the end marker immediately
+    assert slow.queue.get_nowait() is None
+    assert slow.queue.empty()
+    assert not fast.closed.is_set()
+    assert not fast.resync
+    assert broadcaster.dropped_count == 1
+    assert broadcaster.subscriber_count == 1
+    assert broadcaster.subscribers[wallet_id] == {fast}
+
+@pytest.mark.asyncio
+async def test_subscriber_limit():
+    """Test that a worker refuses subscribers beyond MAX_SUBSCRIBERS"""
+    broadcaster = make_broadcaster(max_subscribers=1)
+    with without_database():
+        subscriber = await broadcaster.subscribe({uuid4()})
+        with pytest.raises(SubscriberLimitExceeded):
+            await broadcaster.subscribe({uuid4()})
+        broadcaster.unsubscribe(subscriber)
+        broadcaster.unsubscribe(subscriber)
+        assert broadcaster.subscriber_count == 0
+        assert broadcaster.subscribers == {}
+
+def test_malformed_notification_ignored():
+    """Test that malformed payloads do not break dispatch"""
+    broadcaster = make_broadcaster()
+    broadcaster.dispatch("not json")
+    broadcaster.dispatch(json.dumps({"balance": "1.00"}))
+
+@pytest.mark.asyncio
+async def test_subscribe_renews_lease():
+    """Test that subscribing turns on NOTIFY for the wallets and rolls back on failure"""
+    broadcaster = make_broadcaster()
+    wallet_id = uuid4()
+    with patch.object(BalanceBroadcaster, "_ensure_listening", AsyncMock()), \
+            patch.object(BalanceBroadcaster, "_renew_leases", AsyncMock()) as renew:
+        await broadcaster.subscribe({wallet_id})
+        renew.assert_awaited_once_with([wallet_id])
+
+        renew.side_effect = OSError("connection lost")
+        with pytest.raises(NotificationsUnavailable):
+            await broadcaster.subscribe({uuid4()})
+    assert broadcaster.subscriber_count == 1
+    assert list(broadcaster.subscribers) == [wallet_id]
+
+def make_connection():
+    connection = MagicMock()
+    connection.add_listener = AsyncMock()
+    connection.execute = AsyncMock()
+    connection.close = AsyncMock()
+    return connection
+
+@pytest.mark.asyncio
+async def test_connection_loss_closes_subscribers_for_resync():
+    """Test that losing LISTEN ends every stream with a resync and reconnects lazily"""
+    broadcaster = make_broadcaster()
+    first, second = make_connection(), make_connection()
+    with patch("app.notifications.asyncpg.connect", AsyncMock(side_effect=[first, second])) as connect:
+        sub_a = await broadcaster.subscribe({uuid4()})
+        sub_b = await broadcaster.subscribe({uuid4()})
+        assert connect.await_count == 1
+
+        on_termination = first.add_termination_listener.call_args.args[0]
+        on_termination(first)
+
+        for subscriber in (sub_a, sub_b):
+            assert subscriber.closed.is_set()
+            assert subscriber.resync
+            assert subscriber.queue.get_nowait() is None
+        assert broadcaster.subscriber_count == 0
+        assert broadcaster.subscribers == {}
+
+        # Next subscriber reopens the connection
+        await broadcaster.subscribe({uuid4()})
+        assert connect.await_count == 2
+        await broadcaster.stop()
+
+@pytest.mark.asyncio
+async def test_connect_failure_reported_as_unavailable():
+    """Test that connection errors, including asyncpg interface errors, surface as unavailable"""
+    broadcaster = make_broadcaster()
+    error = asyncpg.InterfaceError("connection is closed")
+    with patch("app.notifications.asyncpg.connect", AsyncMock(side_effect=error)):
+        with pytest.raises(NotificationsUnavailable):
+            await broadcaster.subscribe({uuid4()})
+    assert broadcaster.subscriber_count == 0
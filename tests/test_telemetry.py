@@ -0,0 +1,76 @@
+from app.telemetry import compute_metrics, render
+
+def make_sample(time, xacts, wait_us, updates, hot_updates):
+    return {
+        "time": time,
+        "pools": [{
+            "database": "wallet_db", "user": "wallet_user",
+            "cl_active": 10, "cl_waiting": 5, "sv_active": 45, "sv_idle": 5, "sv_used": 0,
+            "maxwait": 1, "maxwait_us": 500000,
+        }],
+        "databases": [{"name": "wallet_db", "pool_size": 100}],
+        "stats": [{
+            "database": "wallet_db", "total_xact_count": xacts,
+            "total_query_count": xacts * 3, "total_wait_time": wait_us,
+        }],
+        "activity": [
+            {"state": "active", "connections": 8, "lock_waiters": 3, "oldest_xact_seconds": 2.5},
+            {"state": "idle", "connections": 20, "lock_waiters": 0, "oldest_xact_seconds": 0},
+        ],
+        "tables": [{
+            "relname": "wallets", "n_tup_ins": 0, "n_tup_upd": updates,
+            "n_tup_hot_upd": hot_updates, "n_live_tup": 100, "n_dead_tup": 7, "seq_scan": 0,
+        }],
+        "locks": [
+            {"locktype": "tuple", "relation": "wallets", "waiting": 1},
+            {"locktype": "transactionid", "relation": "", "waiting": 3},
+        ],
+        # Waiters on transactionid locks are attributed to wallets through their blockers
+        "wallets_lock_waits": 4,
+    }
+
+def as_dict(metrics):
+    return {(name, tuple(sorted(labels.items()))): value for name, labels, value in metrics}
+
+def test_first_sample_has_no_rates():
+    """Test that rates are only reported once a baseline exists"""
+    metrics = as_dict(compute_metrics(None, make_sample(0.0, 100, 0, 10, 5)))
+    pool = (("database", "wallet_db"), ("user", "wallet_user"))
+    assert metrics[("pgbouncer_pool_saturation", pool)] == 0.5
+    assert metrics[("pgbouncer_pool_maxwait_seconds", pool)] == 1.5
+    assert metrics[("pg_lock_waiting_backends", ())] == 3
+    assert metrics[("pg_wallets_lock_waits", ())] == 4
+    assert metrics[("pg_locks_waiting", (("locktype", "transactionid"), ("relation", "")))] == 3
+    assert metrics[("pg_oldest_transaction_seconds", ())] == 2.5
+    assert not any(name.endswith("_per_second") for name, _ in metrics)
+
+def test_rates_and_ratios():
+    """Test that counter deltas are turned into per-second rates"""
+    previous = make_sample(0.0, 100, 0, 10, 5)
+    current = make_sample(5.0, 600, 2_500_000, 110, 85)
+    metrics = as_dict(compute_metrics(previous, current))
+    database = (("database", "wallet_db"),)
+    table = (("table", "wallets"),)
+    assert metrics[("pgbouncer_transactions_per_second", database)] == 100
+    assert metrics[("pgbouncer_client_wait_seconds_per_second", database)] == 0.5
+    assert metrics[("pgbouncer_client_wait_seconds_per_transaction", database)] == 0.005
+    assert metrics[("pg_table_updates_per_second", table)] == 20
+    assert metrics[("pg_table_hot_update_ratio", table)] == 0.8
+
+def test_counter_reset_skips_rate():
+    """Test that a PgBouncer restart does not produce negative rates"""
+    previous = make_sample(0.0, 1000, 0, 10, 5)
+    current = make_sample(5.0, 10, 0, 10, 5)
+    metrics = as_dict(compute_metrics(previous, current))
+    assert ("pgbouncer_transactions_per_second", (("database", "wallet_db"),)) not in metrics
+
+def test_render_prometheus_format():
+    """Test Prometheus text output with escaped labels"""
+    output = render([
+        ("pg_locks_waiting", {"locktype": "tuple", "relation": 'a"b'}, 2.0),
+        ("pg_locks_waiting", {"locktype": "relation", "relation": "wallets"}, 1.0),
+        ("pg_oldest_transaction_seconds", {}, 0.5),
+    ])
+    assert output.count("# TYPE pg_locks_waiting gauge") == 1
+    assert 'pg_locks_waiting{locktype="tuple",relation="a\\"b"} 2.0' in output
+    assert "pg_oldest_transaction_seconds 0.5" in output
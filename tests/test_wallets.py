@@ -1,11 +1,19 @@
 import pytest
 from httpx import AsyncClient
-from uuid import uuid4
+from uuid import UUID, uuid4
+from sqlalchemy import select, text
+from app import crud
 from app.main import app
+from app.database import settings, get_sessionmaker
+from app.models import DurabilityTier, Transaction
 from unittest.mock import patch
 import asyncio
 from sqlalchemy.exc import DataError, OperationalError
 import random
+from datetime import date, datetime, UTC
+from decimal import Decimal
+import json
+from app.schemas import DailyStats
 
 @pytest.mark.asyncio
 async def test_create_wallet():
@@ -23,6 +31,35 @@ async def test_get_nonexistent_wallet():
         assert response.status_code == 404
         assert response.json()["detail"] == "Wallet not found"
 
+@pytest.mark.asyncio
+async def test_lookup_wallets():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        first_id = (await client.post("/api/v1/wallets/")).json()["id"]
+        second_id = (await client.post("/api/v1/wallets/")).json()["id"]
+        missing_id = str(uuid4())
+
+        response = await client.post(
+            "/api/v1/wallets/lookup",
+            json={"ids": [second_id, missing_id, first_id, second_id]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [wallet["id"] for wallet in data["wallets"]] == [second_id, first_id]
+        assert data["wallets"][0]["balance"] == "0.00"
+        assert data["missing"] == [missing_id]
+
+@pytest.mark.asyncio
+async def test_lookup_wallets_limits():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/v1/wallets/lookup", json={"ids": []})
+        assert response.status_code == 422
+
+        response = await client.post(
+            "/api/v1/wallets/lookup",
+            json={"ids": [str(uuid4()) for _ in range(settings.MAX_LOOKUP_WALLETS + 1)]}
+        )
+        assert response.status_code == 422
+
 @pytest.mark.asyncio
 async def test_deposit_withdraw():
     async with AsyncClient(app=app, base_url="http://test") as client:
@@ -205,4 +242,137 @@ async def test_service_unavailable():
             )
             assert response.status_code == 200
             assert response.json()["status"] == "FAILED"
-    
\ No newline at end of file
+    
+
+@pytest.mark.asyncio
+async def test_durability_tiers():
+    """Test that the requested durability tier is applied, scoped to its transaction and recorded"""
+    seen_settings = []
+    original_add_to_daily_stats = crud.add_to_daily_stats
+
+    async def add_to_daily_stats(session, *args):
+        # Runs inside the operation's transaction, just before the commit
+        result = await session.execute(text("SHOW synchronous_commit"))
+        seen_settings.append(result.scalar_one())
+        await original_add_to_daily_stats(session, *args)
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        wallet_response = await client.post("/api/v1/wallets/")
+        wallet_id = wallet_response.json()["id"]
+
+        with patch("app.crud.add_to_daily_stats", add_to_daily_stats):
+            strict_response = await client.post(
+                f"/api/v1/wallets/{wallet_id}/operation",
+                json={"operation_type": "DEPOSIT", "amount": "100.00"}
+            )
+            async_response = await client.post(
+                f"/api/v1/wallets/{wallet_id}/operation",
+                json={
+                    "operation_type": "DEPOSIT",
+                    "amount": "50.00",
+                    "durability": "ASYNC_COMMIT"
+                }
+            )
+            # The next transaction may reuse the same PgBouncer server connection
+            next_response = await client.post(
+                f"/api/v1/wallets/{wallet_id}/operation",
+                json={"operation_type": "DEPOSIT", "amount": "1.00"}
+            )
+        assert strict_response.status_code == 200
+        assert async_response.status_code == 200
+        assert async_response.json()["status"] == "SUCCESS"
+        assert next_response.status_code == 200
+        assert seen_settings == ["on", "off", "on"]
+
+        async with get_sessionmaker()() as session:
+            result = await session.execute(text("SHOW synchronous_commit"))
+            assert result.scalar_one() == "on"
+            result = await session.execute(
+                select(Transaction.id, Transaction.durability)
+                .where(Transaction.wallet_id == UUID(wallet_id))
+            )
+            stored = dict(result.all())
+        assert stored == {
+            UUID(strict_response.json()["id"]): DurabilityTier.STRICT,
+            UUID(async_response.json()["id"]): DurabilityTier.ASYNC_COMMIT,
+            UUID(next_response.json()["id"]): DurabilityTier.STRICT,
+        }
+
+        wallet = await client.get(f"/api/v1/wallets/{wallet_id}")
+        assert wallet.json()["balance"] == "151.00"
+
+        response = await client.post(
+            f"/api/v1/wallets/{wallet_id}/operation",
+            json={"operation_type": "DEPOSIT", "amount": "1.00", "durability": "NONE"}
+        )
+        assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_commit_lsn_only_with_replica():
+    """Test that writes skip the commit LSN query when no replica is configured"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        wallet_id = (await client.post("/api/v1/wallets/")).json()["id"]
+        with patch("app.routers.wallets.settings.REPLICA_DATABASE_URL", None), \
+                patch("app.routers.wallets.get_commit_lsn") as get_commit_lsn:
+            response = await client.post(
+                f"/api/v1/wallets/{wallet_id}/operation",
+                json={"operation_type": "DEPOSIT", "amount": "1.00"}
+            )
+        assert response.status_code == 200
+        assert "X-Commit-LSN" not in response.headers
+        get_commit_lsn.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_wallet_daily_stats():
+    """Test that operations are rolled up per day and operation type"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        wallet_response = await client.post("/api/v1/wallets/")
+        wallet_id = wallet_response.json()["id"]
+
+        for operation_type, amount in (
+            ("DEPOSIT", "100.00"), ("DEPOSIT", "50.25"), ("WITHDRAW", "30.00")
+        ):
+            response = await client.post(
+                f"/api/v1/wallets/{wallet_id}/operation",
+                json={"operation_type": operation_type, "amount": amount}
+            )
+            assert response.json()["status"] == "SUCCESS"
+
+        today = datetime.now(UTC).date().isoformat()
+        response = await client.get(
+            f"/api/v1/wallets/{wallet_id}/stats",
+            params={"from": today, "to": today}
+        )
+        assert response.status_code == 200
+        days = response.json()["days"]
+        assert days == [{
+            "day": today,
+            "deposit_amount": "150.25",
+            "deposit_count": 2,
+            "withdraw_amount": "30.00",
+            "withdraw_count": 1
+        }]
+
+        response = await client.get(
+            f"/api/v1/wallets/{wallet_id}/stats",
+            params={"from": "2024-01-01", "to": "2026-01-01"}
+        )
+        assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_stats_nonexistent_wallet():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get(f"/api/v1/wallets/{uuid4()}/stats")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Wallet not found"
+
+def test_daily_stats_amounts_keep_precision():
+    """Test that large rollup totals are serialized without float rounding"""
+    stats = DailyStats(
+        day=date(2024, 1, 1),
+        deposit_amount=Decimal("12345678901234567.89"),
+        deposit_count=1
+    )
+    data = json.loads(stats.model_dump_json())
+    assert data["deposit_amount"] == "12345678901234567.89"
+    assert data["withdraw_amount"] == "0.00"